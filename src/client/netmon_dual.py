@@ -1,14 +1,24 @@
 #!/usr/bin/env python3
 import azure
 import csv
+import itertools
 import os
-import subprocess
+import select
+import socket
+import struct
 import time
-import configparser
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date
+from functools import lru_cache
 from pathlib import Path
-from azure.storage.blob import BlobServiceClient
-from configparser import ConfigParser
+from urllib.parse import urljoin
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from pyroute2 import IPRoute
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import BlobServiceClient, BlobType, ContainerClient, ContentSettings, LinearRetry
+from configparser import ConfigParser, Error as ConfigError
 
 # ----------------------------
 # Settings
@@ -17,15 +27,109 @@ INTERVAL_SECONDS = 30
 LOG_DIR = Path("./log")  # change if you prefer
 IFACES = ["eth0", "wlan0"]
 
+# per-iface result keys, in the order check_iface returns them
+CHECK_KEYS = [
+    "iface_up", "iface_ipv4", "gateway", "local_ok", "gateway_rtt_ms",
+    "nos_ok", "nos_status", "nos_response_ms", "public_ip", "iface_ok",
+]
+# CSV columns; the schema is fixed, so build it once
+FIELDS = ["timestamp", "overall_ok", "preferred_iface"] + [f"{i}_{k}" for i in IFACES for k in CHECK_KEYS]
+
 PUBLIC_IP_URL = "https://api.ipify.org"
+PING_TIMEOUT_S = 1
+HTTP_TIMEOUT_S = 6  # per HEAD/GET, redirects included
+HTTP_MAX_REDIRECTS = 5
+HTTP_BODY_MAX = 4096  # a public IP is a few bytes; don't read whole portal pages
+# hard cap on one iface's check: ping 1s + HEAD 6s + GET 6s, plus slack
+PROBE_TIMEOUT_S = PING_TIMEOUT_S + 2 * HTTP_TIMEOUT_S + 2
+
+AZURE_ACCOUNT_DEFAULT = ""
+AZURE_CONNECTION_TIMEOUT = 10  # seconds
+AZURE_READ_TIMEOUT = 60  # seconds
+# linear backoff keeps a failing append bounded; the SDK's default exponential
+# retry waits 15 + 3**n s, hours by the 8th try. Unsent rows go out next cycle.
+AZURE_RETRY_TOTAL = 5
+AZURE_RETRY_BACKOFF = 5  # seconds between retries
+APPEND_BLOCK_MAX = 4 * 1024 * 1024  # append blob block size limit
+UPLOAD_CARRYOVER_ATTEMPTS = 10  # retries for the previous day's tail after midnight
+
+INI_FILE = Path(__file__).with_name("netmon_dual.ini")  # override with NETMON_INI
+
+
+def ini_path() -> str:
+    return os.getenv("NETMON_INI", str(INI_FILE))
+
+
+@lru_cache(maxsize=1)
+def _cfg() -> ConfigParser:
+    """
+    Returns the settings ini, parsed once. _cfg.cache_clear() reloads it.
+    """
+    # no interpolation: URLs and SAS tokens are full of %-escapes
+    c = ConfigParser(interpolation=None)
+    if not c.read(ini_path()):
+        print(f"warning: settings file {ini_path()} not found")
+    return c
+
+
+def url2check() -> str:
+    return _cfg().get("Global", "URL2Check")
+
+
+SO_BINDTODEVICE = getattr(socket, "SO_BINDTODEVICE", 25)
 
-inifileHandler = ConfigParser()
-URL2CHECK = inifileHandler.get('global', 'url2check')
-AZURE_CONTAINER = inifileHandler.get('Azure', 'Container')
-AZURE_STORAGE_CONNECTION_STRING = inifileHandler.get('Azure', 'ConnectionString')
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMP_ID = os.getpid() & 0xFFFF
+ICMP_RECV_SIZE = 1024
+_icmp_seq = itertools.count(1)
 
-def run(cmd, timeout=8):
-    return subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=timeout)
+
+class IfaceAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose sockets are bound to one interface (like curl --interface).
+    """
+
+    def __init__(self, iface: str, **kwargs):
+        self.iface = iface
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = HTTPConnection.default_socket_options + [
+            (socket.SOL_SOCKET, SO_BINDTODEVICE, self.iface.encode()),
+        ]
+        super().init_poolmanager(*args, **kwargs)
+
+
+def iface_session(iface: str) -> requests.Session:
+    s = requests.Session()
+    # one pool per probed host (URL2Check, PUBLIC_IP_URL), a few keep-alive sockets each
+    adapter = IfaceAdapter(iface, pool_connections=2, pool_maxsize=4)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    return s
+
+
+# Azure clients are built on first upload and reused, so the SDK keeps
+# its pooled connection to the storage account
+_container_client = None
+_blob_clients = {}
+# bytes of each daily CSV already appended to its blob
+_uploaded_offsets = {}
+# daily CSV of the last upload, and [previous day's CSV, failed attempts] while
+# its tail may still be unsent; only touched by the upload worker
+_current_upload = None
+_carryover = None
+
+# one probe thread per iface and a single background worker for uploads,
+# both kept for the process lifetime
+PROBE_POOL = ThreadPoolExecutor(max_workers=len(IFACES))
+UPLOAD_POOL = ThreadPoolExecutor(max_workers=1)
+
+# one netlink socket, ICMP socket and HTTP session per iface, reused every cycle
+_icmp_sockets = {}
+IPROUTES = {iface: IPRoute() for iface in IFACES}
+SESSIONS = {iface: iface_session(iface) for iface in IFACES}
 
 
 def ensure_log_dir():
@@ -38,46 +142,84 @@ def ensure_log_dir():
         return fallback
 
 
-def log_path_for_today(log_dir: Path):
-    return log_dir / f"netmon_{date.today().isoformat()}.csv"
+# (date, log_dir, path) of the last lookup; the path only changes at midnight
+_cached_log_path = (None, None, None)
 
 
-def append_row(csv_path: Path, row: dict):
-    new_file = not csv_path.exists()
-    with csv_path.open("a", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=list(row.keys()))
-        if new_file:
-            w.writeheader()
-        w.writerow(row)
+def log_path_for_today(log_dir: Path):
+    global _cached_log_path
+    today = date.today()
+    cached_date, cached_dir, path = _cached_log_path
+    if today != cached_date or log_dir != cached_dir:
+        path = log_dir / f"netmon_{today.isoformat()}.csv"
+        _cached_log_path = (today, log_dir, path)
+    return path
+
 
+class DailyCsv:
+    """
+    Keeps today's CSV open between rows and switches to a new file at midnight.
+    Rows are written in FIELDS order.
+    """
 
-def iface_is_up(iface: str) -> bool:
+    def __init__(self, log_dir: Path):
+        self.log_dir = log_dir
+        self.path = None
+        self.fp = None
+        self.writer = None
+
+    def write(self, row: dict) -> Path:
+        """
+        Appends row to today's file and returns its path.
+        """
+        path = log_path_for_today(self.log_dir)
+        if path != self.path:
+            self.close()
+            self.path = path
+            self.fp = self.path.open("a", newline="")
+            self.writer = csv.writer(self.fp)
+            # append mode opens at the end: position 0 means no header yet
+            if self.fp.tell() == 0:
+                self.writer.writerow(FIELDS)
+        self.writer.writerow([row[k] for k in FIELDS])
+        # the upload worker reads the file, so push each row out right away
+        self.fp.flush()
+        return self.path
+
+    def close(self):
+        if self.fp is not None:
+            self.fp.close()
+            self.fp = None
+
+
+def iface_has_carrier(iface: str) -> bool:
+    """
+    Cheap link check from sysfs; False if the iface is missing or admin down.
+    """
     try:
-        p = run(["ip", "link", "show", "dev", iface], timeout=2)
-        if p.returncode != 0:
-            return False
-        # look for "state UP"
-        return "state UP" in p.stdout
+        with open(f"/sys/class/net/{iface}/carrier") as f:
+            return f.read().strip() == "1"
     except Exception:
         return False
 
 
-def iface_ipv4(iface: str) -> str:
+def iface_info(iface: str):
     """
-    Returns IPv4 address (string) or "" if none.
+    Returns (up: bool, ipv4: str) via netlink.
+    ipv4 is "" if none.
     """
     try:
-        p = run(["ip", "-4", "addr", "show", "dev", iface], timeout=2)
-        if p.returncode != 0:
-            return ""
-        # inet 192.168.1.23/24 ...
-        for line in p.stdout.splitlines():
-            line = line.strip()
-            if line.startswith("inet "):
-                return line.split()[1].split("/")[0]
-        return ""
+        ipr = IPROUTES[iface]
+        idx = ipr.link_lookup(ifname=iface)
+        if not idx:
+            return False, ""
+        link = ipr.get_links(idx[0])[0]
+        up = link.get_attr("IFLA_OPERSTATE") == "UP"
+        for addr in ipr.get_addr(family=socket.AF_INET, index=idx[0]):
+            return up, addr.get_attr("IFA_LOCAL") or addr.get_attr("IFA_ADDRESS") or ""
+        return up, ""
     except Exception:
-        return ""
+        return False, ""
 
 
 def gateway_for_iface(iface: str) -> str:
@@ -85,148 +227,356 @@ def gateway_for_iface(iface: str) -> str:
     Returns default gateway IP for a specific iface, or "".
     """
     try:
-        p = run(["ip", "route", "show", "default", "dev", iface], timeout=2)
-        if p.returncode != 0:
+        ipr = IPROUTES[iface]
+        idx = ipr.link_lookup(ifname=iface)
+        if not idx:
             return ""
-        # default via 192.168.1.1 dev eth0 ...
-        parts = p.stdout.strip().split()
-        for i, tok in enumerate(parts):
-            if tok == "via" and i + 1 < len(parts):
-                return parts[i + 1]
+        for route in ipr.get_default_routes(family=socket.AF_INET):
+            if route.get_attr("RTA_OIF") == idx[0] and route.get_attr("RTA_GATEWAY"):
+                return route.get_attr("RTA_GATEWAY")
         return ""
     except Exception:
         return ""
 
 
-def ping_via_iface(iface: str, host: str, timeout_s=1):
+def icmp_checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def icmp_socket():
+    """
+    Returns (sock, raw: bool). Prefers an unprivileged ICMP datagram socket
+    (net.ipv4.ping_group_range) and falls back to a raw socket.
+    """
+    try:
+        return socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP), False
+    except PermissionError:
+        return socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP), True
+
+
+def icmp_socket_for(iface: str):
+    """
+    Returns the iface's (sock, raw: bool, buf: bytearray), opened and bound
+    on first use. Replies are received into buf, which is reused every ping.
+    """
+    if iface not in _icmp_sockets:
+        sock, raw = icmp_socket()
+        sock.setsockopt(socket.SOL_SOCKET, SO_BINDTODEVICE, iface.encode())
+        _icmp_sockets[iface] = (sock, raw, bytearray(ICMP_RECV_SIZE))
+    return _icmp_sockets[iface]
+
+
+def ping_via_iface(iface: str, host: str, timeout_s=PING_TIMEOUT_S):
     """
     Returns (ok: bool, rtt_ms: float|None)
+    Sends one ICMP echo out of iface and waits for the matching reply.
     """
     try:
-        p = run(["ping", "-I", iface, "-c", "1", "-W", str(timeout_s), host], timeout=timeout_s + 2)
-        if p.returncode != 0:
-            return False, None
-        rtt = None
-        for line in p.stdout.splitlines():
-            if "time=" in line:
-                # ... time=7.23 ms
-                try:
-                    rtt_str = line.split("time=")[1].split()[0]
-                    rtt = float(rtt_str)
-                except Exception:
-                    pass
-                break
-        return True, rtt
+        sock, raw, buf = icmp_socket_for(iface)
+        seq = next(_icmp_seq) & 0xFFFF
+        payload = b"netmon"
+        header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, ICMP_ID, seq)
+        header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, icmp_checksum(header + payload), ICMP_ID, seq)
+
+        # drop whatever queued up since the last ping (a raw socket sees all
+        # ICMP on the iface) so the reply can't be lost to a full buffer
+        try:
+            while True:
+                sock.recv_into(buf, 0, socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            pass
+
+        t0 = time.perf_counter()
+        deadline = t0 + timeout_s
+        sock.sendto(header + payload, (host, 0))
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return False, None
+            readable, _, _ = select.select([sock], [], [], remaining)
+            if not readable:
+                return False, None
+            n, _ = sock.recvfrom_into(buf)
+            rtt = (time.perf_counter() - t0) * 1000.0
+            # raw sockets hand us the IP header too
+            start = (buf[0] & 0x0F) * 4 if raw else 0
+            if n - start < 8:
+                continue
+            icmp_type, _, _, ident, rseq = struct.unpack_from("!BBHHH", buf, start)
+            # late replies to earlier pings are skipped by seq; datagram
+            # sockets rewrite the id, so only check it on raw sockets
+            if icmp_type == ICMP_ECHO_REPLY and rseq == seq and (not raw or ident == ICMP_ID):
+                return True, rtt
     except Exception:
+        # start over with a fresh socket next time
+        entry = _icmp_sockets.pop(iface, None)
+        if entry is not None:
+            entry[0].close()
         return False, None
 
 
-def curl_head_via_iface(iface: str, url: str, timeout_s=6):
+def response_socket(r):
     """
-    Returns (ok: bool, response_ms: float|None, http_code: int|None)
-    Uses curl with --interface to force the egress interface.
+    Returns the socket under a streamed requests response, or None.
     """
-    try:
-        # time_total in seconds; convert to ms
-        cmd = [
-            "curl", "--interface", iface,
-            "-I",  # HEAD
-            "-L",  # follow redirects
-            "--max-time", str(timeout_s),
-            "-o", "/dev/null",
-            "-sS",
-            "-w", "%{http_code} %{time_total}",
-            url
-        ]
-        p = run(cmd, timeout=timeout_s + 2)
-        if p.returncode != 0:
-            return False, None, None
-        out = p.stdout.strip().split()
-        if len(out) != 2:
-            return False, None, None
-        code = int(out[0])
-        t_sec = float(out[1])
-        ms = t_sec * 1000.0
-        ok = 200 <= code < 600  # treat any HTTP response as "reachable"
-        return ok, ms, code
-    except Exception:
-        return False, None, None
+    # the body is read through http.client's socket file; the connection may
+    # have dropped its reference already if the server closes after the response
+    fp = getattr(getattr(r.raw, "_fp", None), "fp", None)
+    sock = getattr(getattr(fp, "raw", None), "_sock", None)
+    if sock is None:
+        conn = getattr(r.raw, "connection", None) or getattr(r.raw, "_connection", None)
+        sock = getattr(conn, "sock", None)
+    return sock
 
 
-def curl_get_via_iface(iface: str, url: str, timeout_s=6):
+def http_via_iface(iface: str, url: str, method="HEAD", timeout_s=HTTP_TIMEOUT_S):
     """
-    Returns response body string or "".
+    Returns (ok: bool, response_ms: float|None, http_code: int|None, body: str)
+    Uses the iface's pooled session so the request leaves through that interface.
+    Like curl --max-time, timeout_s caps the exchange including redirects;
+    reading the response headers is bounded per read by the time left.
     """
+    session = SESSIONS[iface]
+    t0 = time.perf_counter()
+    deadline = t0 + timeout_s
     try:
-        cmd = [
-            "curl", "--interface", iface,
-            "-L",
-            "--max-time", str(timeout_s),
-            "-sS",
-            url
-        ]
-        p = run(cmd, timeout=timeout_s + 2)
-        if p.returncode != 0:
-            return ""
-        return p.stdout.strip()
+        for _ in range(HTTP_MAX_REDIRECTS + 1):
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return False, None, None, ""
+            # requests' timeout is per connect/read, so follow redirects and
+            # read the body ourselves to enforce the overall deadline
+            with session.request(method, url, allow_redirects=False, stream=True, timeout=remaining) as r:
+                target = session.get_redirect_target(r)
+                if target:
+                    url = urljoin(url, target)
+                    continue
+                # byte-wise, shrinking the socket timeout to what is left before
+                # each read: larger chunks block until filled and the request's
+                # timeout applies afresh to every read
+                sock = response_socket(r)
+                body = bytearray()
+                chunks = r.iter_content(1)
+                while len(body) < HTTP_BODY_MAX:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        return False, None, None, ""
+                    if sock is not None and sock.fileno() != -1:
+                        sock.settimeout(remaining)
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    body += chunk
+                if time.perf_counter() > deadline:
+                    return False, None, None, ""
+                ms = (time.perf_counter() - t0) * 1000.0
+                code = r.status_code
+                ok = 200 <= code < 600  # treat any HTTP response as "reachable"
+                return ok, ms, code, bytes(body).strip().decode("utf-8", "replace")
+        return False, None, None, ""  # too many redirects
     except Exception:
-        return ""
+        return False, None, None, ""
 
 
-def azure_upload(local_file: Path):
+def http_head_via_iface(iface: str, url: str, timeout_s=HTTP_TIMEOUT_S):
     """
-    Uploads to Azure Blob Storage if env vars are present.
+    Returns (ok: bool, response_ms: float|None, http_code: int|None)
     """
-    container = os.getenv("AZURE_CONTAINER", "").strip()
-    if not container:
-        return False, "AZURE_CONTAINER not set"
+    return http_via_iface(iface, url, "HEAD", timeout_s)[:3]
 
-    conn_str = os.getenv("AZURE_STORAGE_CONNECTION_STRING", "").strip()
-    sas = os.getenv("AZURE_STORAGE_SAS_TOKEN", "").strip()
-    account = os.getenv("AZURE_STORAGE_ACCOUNT", AZURE_ACCOUNT_DEFAULT).strip()
 
-    try:
-        if conn_str:
-            bsc = BlobServiceClient.from_connection_string(conn_str)
+def http_get_via_iface(iface: str, url: str, timeout_s=HTTP_TIMEOUT_S):
+    """
+    Returns response body string or "".
+    """
+    return http_via_iface(iface, url, "GET", timeout_s)[3]
+
+
+def azure_container():
+    """
+    Returns (ContainerClient, "") built once from env vars or the ini,
+    or (None, reason) if Azure isn't configured.
+    """
+    global _container_client
+    if _container_client is None:
+        container = os.getenv("AZURE_CONTAINER", "").strip() or _cfg().get("Azure", "Container", fallback="").strip()
+        conn_str = os.getenv("AZURE_STORAGE_CONNECTION_STRING", "").strip() or \
+            _cfg().get("Azure", "ConnectionString", fallback="").strip()
+        sas = os.getenv("AZURE_STORAGE_SAS_TOKEN", "").strip()
+        account = os.getenv("AZURE_STORAGE_ACCOUNT", AZURE_ACCOUNT_DEFAULT).strip()
+        options = {
+            "connection_timeout": AZURE_CONNECTION_TIMEOUT,
+            "read_timeout": AZURE_READ_TIMEOUT,
+            "retry_policy": LinearRetry(backoff=AZURE_RETRY_BACKOFF, retry_total=AZURE_RETRY_TOTAL),
+        }
+        if conn_str.startswith("https://"):
+            # container SAS URL, the container name is part of it
+            _container_client = ContainerClient.from_container_url(conn_str, **options)
+        elif not container:
+            return None, "AZURE_CONTAINER not set"
+        elif conn_str:
+            bsc = BlobServiceClient.from_connection_string(conn_str, **options)
+            _container_client = bsc.get_container_client(container)
         elif sas:
             account_url = f"https://{account}.blob.core.windows.net"
-            bsc = BlobServiceClient(account_url=account_url, credential=sas)
+            bsc = BlobServiceClient(account_url=account_url, credential=sas, **options)
+            _container_client = bsc.get_container_client(container)
         else:
-            return False, "No AZURE_STORAGE_CONNECTION_STRING or AZURE_STORAGE_SAS_TOKEN set"
+            return None, "No AZURE_STORAGE_CONNECTION_STRING or AZURE_STORAGE_SAS_TOKEN set"
+    return _container_client, ""
 
-        blob_name = local_file.name
-        blob_client = bsc.get_blob_client(container=container, blob=blob_name)
 
-        with local_file.open("rb") as data:
-            blob_client.upload_blob(data, overwrite=True)
+def append_blob_offset(blob_client, local_size: int) -> int:
+    """
+    Returns how many bytes of the local file the blob already holds,
+    (re)creating it as an append blob when it can't be appended to.
+    """
+    try:
+        props = blob_client.get_blob_properties()
+        if props.blob_type == BlobType.APPENDBLOB and props.size <= local_size:
+            return props.size
+    except ResourceNotFoundError:
+        pass
+    # stored uncompressed: resuming relies on the blob length matching the local
+    # file, and each append is only a row or two, too small for gzip to pay off
+    blob_client.create_append_blob(content_settings=ContentSettings(content_type="text/csv"))
+    return 0
 
-        return True, f"Uploaded to container '{container}' as '{blob_name}'"
+
+def azure_upload(local_file: Path):
+    """
+    Appends the not yet uploaded tail of local_file to its append blob
+    in Azure Blob Storage if env vars or the ini provide credentials.
+    """
+    blob_name = local_file.name
+    try:
+        container_client, msg = azure_container()
+        if container_client is None:
+            return False, msg
+        container = container_client.container_name
+        if blob_name not in _blob_clients:
+            _blob_clients[blob_name] = container_client.get_blob_client(blob_name)
+        blob_client = _blob_clients[blob_name]
+
+        local_size = local_file.stat().st_size
+        offset = _uploaded_offsets.get(blob_name)
+        if offset is None:
+            # first upload of this file (startup or new day)
+            offset = append_blob_offset(blob_client, local_size)
+            _uploaded_offsets[blob_name] = offset
+        if offset == local_size:
+            return True, f"'{blob_name}' unchanged since last upload"
+
+        appended = 0
+        with local_file.open("rb") as f:
+            f.seek(offset)
+            while chunk := f.read(APPEND_BLOCK_MAX):
+                # appendpos guards against appending twice after a lost response
+                blob_client.append_block(chunk, appendpos_condition=offset)
+                offset += len(chunk)
+                appended += len(chunk)
+                _uploaded_offsets[blob_name] = offset
+
+        return True, f"Appended {appended} bytes to '{blob_name}' in container '{container}'"
     except Exception as e:
+        # re-read the blob length before the next attempt
+        _uploaded_offsets.pop(blob_name, None)
         return False, f"Azure upload failed: {e}"
 
 
+def open_upload_log(log_dir: Path) -> int:
+    """
+    Returns an O_APPEND fd for the upload log, kept open for the process lifetime.
+    """
+    return os.open(log_dir / "netmon_upload.log", os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+
+def forget_upload(path: Path):
+    _uploaded_offsets.pop(path.name, None)
+    _blob_clients.pop(path.name, None)
+
+
+def upload_and_log(log_fd: int, csv_path: Path, ts: str, overall_ok: bool, preferred: str):
+    """
+    Uploads csv_path, after first retrying the previous day's file if its tail
+    may not be uploaded yet (e.g. that day's last upload was skipped or failed).
+    Writes one log line per call.
+    """
+    global _current_upload, _carryover
+    if _current_upload is not None and _current_upload != csv_path:
+        # new day: only the day before gets a catch-up, anything older is dropped
+        if _carryover is not None:
+            forget_upload(_carryover[0])
+        _carryover = [_current_upload, 0]
+    _current_upload = csv_path
+
+    note = ""
+    if _carryover is not None:
+        path = _carryover[0]
+        if not path.exists():
+            ok, msg, done = False, "file missing, dropped", True
+        else:
+            ok, msg = azure_upload(path)
+            _carryover[1] += not ok
+            done = ok or _carryover[1] >= UPLOAD_CARRYOVER_ATTEMPTS
+            if not ok and done:
+                msg += ", giving up"
+        note = f" | carry-over {path.name}: {ok} {msg}"
+        if done:
+            forget_upload(path)
+            _carryover = None
+
+    ok, msg = azure_upload(csv_path)
+    try:
+        # one write per line; O_APPEND keeps each line intact at the end of the file
+        line = f"{ts} | {csv_path.name} | overall_ok={overall_ok} | preferred={preferred} | {ok} | {msg}{note}\n"
+        os.write(log_fd, line.encode())
+    except Exception:
+        pass
+
+
+def failed_check():
+    """
+    Result row for an iface whose check raised or didn't finish in time.
+    """
+    r = dict.fromkeys(CHECK_KEYS, "")
+    r.update(iface_up=0, local_ok=0, nos_ok=0, iface_ok=0)
+    return r
+
+
 def check_iface(iface: str):
     """
     Returns dict with results for one interface.
     """
-    up = iface_is_up(iface)
-    ip4 = iface_ipv4(iface) if up else ""
+    # no carrier (cable unplugged, wifi not associated): skip all other lookups
+    up, ip4 = iface_info(iface) if iface_has_carrier(iface) else (False, "")
+    ip4 = ip4 if up else ""
     gw = gateway_for_iface(iface) if ip4 else ""
 
     local_ok = False
     gw_rtt = None
     if gw:
-        local_ok, gw_rtt = ping_via_iface(iface, gw, timeout_s=1)
+        local_ok, gw_rtt = ping_via_iface(iface, gw)
 
     nos_ok = False
     nos_ms = None
     nos_code = None
     public_ip = ""
 
-    if local_ok:
-        nos_ok, nos_ms, nos_code = curl_head_via_iface(iface, URL2CHECK, timeout_s=6)
+    url = url2check()
+    if local_ok and url == PUBLIC_IP_URL:
+        # same endpoint: one GET answers both checks on one connection
+        nos_ok, nos_ms, nos_code, body = http_via_iface(iface, url, "GET")
+        public_ip = body if nos_ok else ""
+    elif local_ok:
+        nos_ok, nos_ms, nos_code = http_head_via_iface(iface, url)
         if nos_ok:
-            public_ip = curl_get_via_iface(iface, PUBLIC_IP_URL, timeout_s=6)
+            public_ip = http_get_via_iface(iface, PUBLIC_IP_URL)
 
     iface_ok = bool(local_ok and nos_ok)
 
@@ -244,12 +594,55 @@ def check_iface(iface: str):
     }
 
 
+def close_handles():
+    """
+    Waits for running probes and uploads, then closes the per-iface sockets and sessions.
+    """
+    PROBE_POOL.shutdown(wait=True)
+    UPLOAD_POOL.shutdown(wait=True)
+    for iface in IFACES:
+        SESSIONS[iface].close()
+        IPROUTES[iface].close()
+        entry = _icmp_sockets.pop(iface, None)
+        if entry is not None:
+            entry[0].close()
+
+
 def main():
+    try:
+        url2check()
+    except ConfigError as e:
+        raise SystemExit(f"{ini_path()}: {e}")
+
     log_dir = ensure_log_dir()
+    daily_csv = DailyCsv(log_dir)
+    upload_log_fd = open_upload_log(log_dir)
+    upload_future = None
+    probe_futures = {}
+    next_tick = time.monotonic()
 
     while True:
         ts = datetime.now().isoformat(timespec="seconds")
-        results = {iface: check_iface(iface) for iface in IFACES}
+        # probe all interfaces in parallel; every check blocks on network I/O
+        # an iface whose previous check is still running is reported down
+        # rather than probed twice over its shared sockets and session
+        results = {}
+        for iface in IFACES:
+            f = probe_futures.get(iface)
+            if f is None or f.done():
+                probe_futures[iface] = PROBE_POOL.submit(check_iface, iface)
+            else:
+                print(f"{ts} - {iface} previous check still running, skipping")
+                results[iface] = failed_check()
+        probe_deadline = time.monotonic() + PROBE_TIMEOUT_S
+        for iface, f in probe_futures.items():
+            if iface in results:
+                continue
+            try:
+                results[iface] = f.result(timeout=max(0, probe_deadline - time.monotonic()))
+            except Exception as e:
+                print(f"{ts} - {iface} check failed: {e!r}")
+                results[iface] = failed_check()
 
         # overall OK if any iface works
         overall_ok = any(results[i]["iface_ok"] == 1 for i in IFACES)
@@ -271,21 +664,32 @@ def main():
             for k, v in r.items():
                 row[f"{iface}_{k}"] = v
 
-        csv_path = log_path_for_today(log_dir)
-        print(f"{ts} - add results to {csv_path}")
-        append_row(csv_path, row)
+        csv_path = daily_csv.write(row)
+        print(f"{ts} - added results to {csv_path}")
 
-        # Upload the daily file if at least one interface is OK
+        # Upload the daily file if at least one interface is OK, in the
+        # background so a slow upload never delays the next probe. If the
+        # previous upload is still running, skip: the next one sends its rows
+        # too, including the previous day's tail after midnight.
         if overall_ok:
-            ok, msg = azure_upload(csv_path)
-            try:
-                with (log_dir / "netmon_upload.log").open("a") as f:
-                    f.write(f"{ts} | {csv_path.name} | overall_ok={overall_ok} | preferred={preferred} | {ok} | {msg}\n")
-            except Exception:
-                pass
-
-        time.sleep(INTERVAL_SECONDS)
+            if upload_future is None or upload_future.done():
+                upload_future = UPLOAD_POOL.submit(upload_and_log, upload_log_fd, csv_path, ts, overall_ok, preferred)
+            else:
+                print(f"{ts} - previous upload still running, skipping upload")
+
+        # sleep to the next fixed tick so the work time doesn't make the interval drift
+        next_tick += INTERVAL_SECONDS
+        delay = next_tick - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            print(f"{ts} - cycle overran by {-delay:.1f}s")
+            # start over from now instead of running back-to-back catch-up cycles
+            next_tick = time.monotonic()
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        close_handles()